@@ -1,10 +1,305 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
-import matplotlib.pyplot as plt
 import io
-from fpdf import FPDF
+import threading
+import types
+from functools import lru_cache
+from typing import NamedTuple
+
+# matplotlib, fpdf and numba are imported inside the functions that use
+# them, so the sidebar renders before any of those (slow) imports are paid for.
+
+# Starting values for a rental row; rate and mgmt_fee are entered as percentages.
+RENTAL_DEFAULTS = {
+    "loan": 385000,
+    "rate": 4.99,
+    "term": 30,
+    "type": "Interest-Only",
+    "rent_weekly": 760,
+    "insurance": 3500,
+    "rates": 4300,
+    "maintenance": 2000,
+    "mgmt_fee": 5.2,
+    "depreciation": 1500
+}
+RENTAL_FIELDS = tuple(RENTAL_DEFAULTS)
+
+
+class PortfolioResult(NamedTuple):
+    total_rent: float
+    total_expenses: float
+    total_tax_savings: float
+    total_cash_freed: float
+    principal_paid: np.ndarray
+    cumulative_interest_saved: np.ndarray
+    # Per-property figures, in rental input order
+    annual_rent: np.ndarray
+    interest: np.ndarray
+    expenses: np.ndarray
+    tax_savings: np.ndarray
+
+
+def rental_arrays(props_tuple):
+    # Struct-of-arrays view of the rental inputs: one float64 array per numeric
+    # field, plus an "is_io" mask in place of the repayment type.
+    rentals = {
+        field: np.array([prop[i] for prop in props_tuple], dtype=np.float64)
+        for i, field in enumerate(RENTAL_FIELDS) if field != "type"
+    }
+    type_idx = RENTAL_FIELDS.index("type")
+    rentals["is_io"] = np.array([prop[type_idx] == "Interest-Only" for prop in props_tuple], dtype=bool)
+    return rentals
+
+
+# Loop range used by aggregate_rentals: plain range when it runs as Python,
+# numba.prange once compiled_aggregate rebinds it for the parallel build.
+prange = range
+
+
+@lru_cache(maxsize=128)
+def compound_factor(rate, term_years):
+    # (1 + r/12)^(12n) for an annual rate and term in years. Portfolios often repeat
+    # the same rate and term, so the plain-Python path memoises it; compiled_aggregate
+    # gives numba the unwrapped function instead.
+    return (1.0 + rate / 12.0) ** (term_years * 12.0)
+
+
+def aggregate_rentals(loans, rates, terms, rent_weekly, insurance, council_rates, maintenance,
+                      mgmt_fee, depreciation, is_io, tax_rate):
+    # One fused pass over the rental arrays, returning the portfolio totals and the
+    # per-property figures they are summed from:
+    # (total rent, total expenses, total tax savings, total cash freed,
+    #  annual rent, annual interest, expenses, tax savings per property).
+    # The totals are plain += reductions, so numba can split the loop across threads.
+    rent_out = np.empty(loans.size)
+    interest_out = np.empty(loans.size)
+    expenses_out = np.empty(loans.size)
+    tax_savings_out = np.empty(loans.size)
+    total_rent = total_expenses = total_tax_savings = total_cash_freed = 0.0
+    for i in prange(loans.size):
+        annual_rent = rent_weekly[i] * 52.0
+        interest = loans[i] * rates[i]
+        mgmt_cost = annual_rent * mgmt_fee[i]
+        expenses = interest + insurance[i] + council_rates[i] + maintenance[i] + mgmt_cost + depreciation[i]
+        tax_savings = min(expenses, annual_rent) * tax_rate
+        rent_out[i] = annual_rent
+        interest_out[i] = interest
+        expenses_out[i] = expenses
+        tax_savings_out[i] = tax_savings
+
+        if is_io[i]:
+            # Closed-form amortising payment (numpy_financial.pmt with fv=0, when=0)
+            r = rates[i] / 12.0
+            if r == 0.0:
+                monthly_pni = loans[i] / (terms[i] * 12.0)
+            else:
+                c = compound_factor(rates[i], terms[i])
+                monthly_pni = loans[i] * r * c / (c - 1.0)
+            cash_freed = monthly_pni * 12.0 - interest
+        else:
+            cash_freed = 0.0
+
+        total_rent += annual_rent
+        total_expenses += expenses
+        total_tax_savings += tax_savings
+        total_cash_freed += cash_freed
+    return (total_rent, total_expenses, total_tax_savings, total_cash_freed,
+            rent_out, interest_out, expenses_out, tax_savings_out)
+
+
+@st.cache_resource(show_spinner=False)
+def compiled_aggregate():
+    # The script body is re-executed on every rerun, so the jitted dispatcher is
+    # held as a process-wide resource and compiled here, once, on a dummy portfolio.
+    try:
+        import numba
+        from numba import njit, prange as numba_prange
+        from numba.extending import overload
+    except ImportError:  # numba is optional; aggregate_rentals then runs as plain Python
+        return aggregate_rentals
+
+    @overload(compound_factor)
+    def _compound_factor_jit(rate, term_years):
+        return compound_factor.__wrapped__
+
+    ones = np.ones(1, dtype=np.float64)
+    warm_args = (ones, ones, ones, ones, ones, ones, ones, ones, ones, np.ones(1, dtype=bool), 0.0)
+
+    kernel = types.FunctionType(aggregate_rentals.__code__,
+                                dict(aggregate_rentals.__globals__, prange=numba_prange),
+                                aggregate_rentals.__name__)
+    aggregate = njit(parallel=True, cache=True, fastmath=True)(kernel)
+
+    # Sessions call this concurrently from their own script threads, so only the
+    # thread-safe layers are tried (workqueue aborts the process on concurrent use).
+    # OpenMP goes first: a TBB pool started from a script thread keeps the
+    # interpreter from exiting.
+    for layer in ("omp", "tbb"):
+        numba.config.THREADING_LAYER = layer
+        try:
+            aggregate(*warm_args)
+        except ValueError:  # layer not installed
+            continue
+        return aggregate
+
+    # No thread-safe layer: compile the loop serially. Not cached on disk, since
+    # it would share the parallel build's cache key (same bytecode and signature).
+    aggregate = njit(fastmath=True)(aggregate_rentals)
+    aggregate(*warm_args)
+    return aggregate
+
+
+# --- Cached Model & Export Builders ---
+# Streamlit reruns the whole script on every widget interaction, so the model and
+# the export builders are cached on their (hashable) inputs. Entries are capped,
+# since any portfolio can be entered and each distinct one would otherwise be kept.
+@st.cache_data(ttl=None, max_entries=32, show_spinner=False)
+def compute_portfolio(props_tuple, tax_rate, home_loan, home_rate, projection_years):
+    rentals = rental_arrays(props_tuple)
+    (total_rent, total_expenses, total_tax_savings, total_cash_freed,
+     annual_rent, interest, expenses, tax_savings) = compiled_aggregate()(
+        rentals["loan"], rentals["rate"], rentals["term"], rentals["rent_weekly"], rentals["insurance"],
+        rentals["rates"], rentals["maintenance"], rentals["mgmt_fee"], rentals["depreciation"],
+        rentals["is_io"], float(tax_rate))
+
+    # --- Revolving Credit Impact ---
+    years = np.arange(1, projection_years + 1)
+    principal_paid = total_cash_freed * years
+    annual_savings = (home_loan - principal_paid) * home_rate
+    cumulative_interest_saved = np.cumsum(annual_savings)
+
+    return PortfolioResult(total_rent, total_expenses, total_tax_savings, total_cash_freed,
+                           principal_paid, cumulative_interest_saved,
+                           annual_rent, interest, expenses, tax_savings)
+
+
+@st.cache_resource(show_spinner=False)
+def chart_state():
+    # One figure per process, cleared and redrawn for each new projection. The lock
+    # serialises access since sessions run on separate script threads.
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    return fig, ax, threading.Lock()
+
+
+@st.cache_data(ttl=None, max_entries=32, show_spinner=False)
+def render_chart(years_tuple, paid_tuple, saved_tuple):
+    # Rendered PNG of the projection for the PDF report; cached so preparing the
+    # report again for an unchanged projection skips matplotlib entirely.
+    fig, ax, lock = chart_state()
+    with lock:
+        ax.cla()
+        ax.plot(years_tuple, paid_tuple, label="Total Extra Paid", marker='o')
+        ax.plot(years_tuple, saved_tuple, label="Interest Saved", marker='s')
+        ax.set_xlabel("Year")
+        ax.set_ylabel("Amount ($)")
+        ax.set_title("Owner-Occupied Loan Strategy")
+        ax.grid(True)
+        ax.legend()
+
+        img_buffer = io.BytesIO()
+        fig.savefig(img_buffer, format='png', bbox_inches='tight')
+    return img_buffer.getvalue()
+
+
+@st.cache_data(ttl=None, max_entries=32, show_spinner=False)
+def build_csv(props_tuple):
+    csv_data = pd.DataFrame.from_records(props_tuple, columns=list(RENTAL_FIELDS))
+    csv_data["Annual Rent"] = csv_data["rent_weekly"] * 52
+    csv_data["Interest"] = csv_data["loan"] * csv_data["rate"]
+    return csv_data.to_csv(index=False).encode()
+
+
+@st.cache_resource(show_spinner=False)
+def pdf_template():
+    # The report class is defined once per process rather than on every rerun.
+    from fpdf import FPDF
+
+    class PDF(FPDF):
+        def header(self):
+            self.set_font("Arial", "B", 12)
+            self.cell(0, 10, "NZ Property Portfolio Report", ln=True, align="C")
+
+        def section(self, title, content):
+            self.set_font("Arial", "B", 11)
+            self.cell(0, 10, title, ln=True)
+            self.set_font("Arial", "", 10)
+            for line in content:
+                self.cell(0, 8, line, ln=True)
+
+    return PDF
+
+
+@st.cache_data(ttl=None, max_entries=32, show_spinner=False)
+def build_pdf_bytes(summary_tuple, props_tuple, breakdown_tuple, chart_png):
+    total_rent, total_expenses, total_tax_savings, total_cash_freed, extra_paid, cumulative_saved = summary_tuple
+    annual_rent, interest, expenses, tax_savings = breakdown_tuple
+
+    pdf = pdf_template()()
+    pdf.add_page()
+
+    # Summary
+    pdf.section("Rental Summary", [
+        f"Total Annual Rent: ${total_rent:,.0f}",
+        f"Total Expenses: ${total_expenses:,.0f}",
+        f"Total Tax Saved: ${total_tax_savings:,.0f}",
+        f"Cash Freed from Interest-Only Loans: ${total_cash_freed:,.0f}"
+    ])
+
+    pdf.section("Owner-Occupied Loan Strategy", [
+        f"Extra Paid into Revolving Credit: ${extra_paid:,.0f}",
+        f"Cumulative Interest Saved: ${cumulative_saved:,.0f}"
+    ])
+
+    # Chart
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 10, "Interest Savings Projection", ln=True)
+    pdf.image(io.BytesIO(chart_png), x=10, y=None, w=180)
+
+    # Rental property breakdowns
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "Rental Property Details", ln=True)
+
+    for idx, values in enumerate(props_tuple):
+        prop = dict(zip(RENTAL_FIELDS, values))
+
+        pdf.set_font("Arial", "B", 11)
+        pdf.cell(0, 10, f"Property {idx + 1}", ln=True)
+        pdf.set_font("Arial", "", 10)
+
+        prop_lines = [
+            f"Loan Balance: ${prop['loan']:,.0f}",
+            f"Interest Rate: {prop['rate']*100:.2f}%",
+            f"Term: {prop['term']} years",
+            f"Repayment Type: {prop['type']}",
+            f"Weekly Rent: ${prop['rent_weekly']:,.0f}",
+            f"Annual Rent: ${annual_rent[idx]:,.0f}",
+            f"Insurance: ${prop['insurance']:,.0f}",
+            f"Rates: ${prop['rates']:,.0f}",
+            f"Maintenance: ${prop['maintenance']:,.0f}",
+            f"Mgmt Fee: {prop['mgmt_fee']*100:.2f}%",
+            f"Depreciation: ${prop['depreciation']:,.0f}",
+            f"Annual Interest: ${interest[idx]:,.0f}",
+            f"Total Expenses: ${expenses[idx]:,.0f}",
+            f"Estimated Tax Savings: ${tax_savings[idx]:,.0f}"
+        ]
+
+        for line in prop_lines:
+            pdf.cell(0, 8, line, ln=True)
+        pdf.ln(4)
+
+    # Finalise
+    pdf_buffer = io.BytesIO()
+    pdf.output(pdf_buffer)
+    return pdf_buffer.getvalue()
+
 
 st.set_page_config(page_title="NZ Property Tax & Mortgage Optimiser", layout="wide")
 
@@ -18,90 +313,62 @@ It models the impact of deductible rental expenses, repayment types, and revolvi
 # --- Sidebar Inputs ---
 st.sidebar.header("🔧 Input Parameters")
 
-# --- Owner-Occupied Inputs ---
-st.sidebar.subheader("🏠 Owner-Occupied Home Loan")
-home_loan = st.sidebar.number_input("Home Loan Balance ($)", value=975000, step=1000)
-home_rate = st.sidebar.number_input("Home Loan Interest Rate (%)", value=4.99, step=0.01) / 100
-home_term = st.sidebar.number_input("Home Loan Term (years)", value=30, step=1)
-home_insurance = st.sidebar.number_input("Home Insurance ($/year)", value=4200, step=100)
-home_rates = st.sidebar.number_input("Home Council Rates ($/year)", value=4300, step=100)
-
-# --- Rental Portfolio Inputs ---
-st.sidebar.subheader("🏘 Rental Portfolio")
-num_rentals = st.sidebar.number_input("Number of Rental Properties", min_value=1, max_value=10, value=1)
-
-rental_properties = []
-
-for i in range(num_rentals):
-    with st.sidebar.expander(f"Rental Property {i+1}"):
-        loan = st.number_input(f"[{i+1}] Loan Balance ($)", value=385000, step=1000, key=f"loan_{i}")
-        rate = st.number_input(f"[{i+1}] Interest Rate (%)", value=4.99, step=0.01, key=f"rate_{i}") / 100
-        term = st.number_input(f"[{i+1}] Loan Term (years)", value=30, step=1, key=f"term_{i}")
-        repayment_type = st.selectbox(f"[{i+1}] Repayment Type", ["Interest-Only", "Principal & Interest"], key=f"type_{i}")
-        rent_weekly = st.number_input(f"[{i+1}] Weekly Rent ($)", value=760, key=f"rent_{i}")
-        insurance = st.number_input(f"[{i+1}] Insurance ($/year)", value=3500, key=f"ins_{i}")
-        rates = st.number_input(f"[{i+1}] Council Rates ($/year)", value=4300, key=f"rates_{i}")
-        maintenance = st.number_input(f"[{i+1}] Maintenance ($/year)", value=2000, key=f"maint_{i}")
-        mgmt_fee = st.number_input(f"[{i+1}] Property Mgmt Fee (%)", value=5.2, key=f"mgmt_{i}") / 100
-        depreciation = st.number_input(f"[{i+1}] Chattel Depreciation ($)", value=1500, key=f"dep_{i}")
-
-        rental_properties.append({
-            "loan": loan,
-            "rate": rate,
-            "term": term,
-            "type": repayment_type,
-            "rent_weekly": rent_weekly,
-            "insurance": insurance,
-            "rates": rates,
-            "maintenance": maintenance,
-            "mgmt_fee": mgmt_fee,
-            "depreciation": depreciation
-        })
-
-# --- Global Settings ---
-st.sidebar.subheader("⚙️ Global Settings")
-tax_rate = st.sidebar.number_input("Marginal Tax Rate (%)", value=33) / 100
-projection_years = st.sidebar.slider("Projection Period (years)", 1, 10, 5)
+# All inputs sit in one form so edits are applied together, in a single rerun,
+# when the form is submitted.
+with st.sidebar.form("all_inputs"):
+    # --- Owner-Occupied Inputs ---
+    st.subheader("🏠 Owner-Occupied Home Loan")
+    home_loan = st.number_input("Home Loan Balance ($)", value=975000, step=1000)
+    home_rate = st.number_input("Home Loan Interest Rate (%)", value=4.99, step=0.01) / 100
+    home_term = st.number_input("Home Loan Term (years)", value=30, step=1)
+    home_insurance = st.number_input("Home Insurance ($/year)", value=4200, step=100)
+    home_rates = st.number_input("Home Council Rates ($/year)", value=4300, step=100)
+
+    # --- Rental Portfolio Inputs ---
+    st.subheader("🏘 Rental Portfolio")
+    rentals_df = st.data_editor(
+        pd.DataFrame([RENTAL_DEFAULTS]),
+        num_rows="dynamic",
+        key="rentals",
+        column_config={
+            "loan": st.column_config.NumberColumn("Loan Balance ($)", step=1000, default=RENTAL_DEFAULTS["loan"]),
+            "rate": st.column_config.NumberColumn("Interest Rate (%)", step=0.01, default=RENTAL_DEFAULTS["rate"]),
+            "term": st.column_config.NumberColumn("Loan Term (years)", step=1, default=RENTAL_DEFAULTS["term"]),
+            "type": st.column_config.SelectboxColumn("Repayment Type", options=["Interest-Only", "Principal & Interest"],
+                                                     default=RENTAL_DEFAULTS["type"], required=True),
+            "rent_weekly": st.column_config.NumberColumn("Weekly Rent ($)", default=RENTAL_DEFAULTS["rent_weekly"]),
+            "insurance": st.column_config.NumberColumn("Insurance ($/year)", default=RENTAL_DEFAULTS["insurance"]),
+            "rates": st.column_config.NumberColumn("Council Rates ($/year)", default=RENTAL_DEFAULTS["rates"]),
+            "maintenance": st.column_config.NumberColumn("Maintenance ($/year)", default=RENTAL_DEFAULTS["maintenance"]),
+            "mgmt_fee": st.column_config.NumberColumn("Property Mgmt Fee (%)", default=RENTAL_DEFAULTS["mgmt_fee"]),
+            "depreciation": st.column_config.NumberColumn("Chattel Depreciation ($)", default=RENTAL_DEFAULTS["depreciation"])
+        }
+    )
+
+    # --- Global Settings ---
+    st.subheader("⚙️ Global Settings")
+    tax_rate = st.number_input("Marginal Tax Rate (%)", value=33) / 100
+    projection_years = st.slider("Projection Period (years)", 1, 10, 5)
+
+    st.form_submit_button("Recalculate")
 
 # --- Calculations ---
-total_rent = 0
-total_expenses = 0
-total_tax_savings = 0
-total_cash_freed = 0
-
-for prop in rental_properties:
-    annual_rent = prop["rent_weekly"] * 52
-    interest = prop["loan"] * prop["rate"]
-    mgmt_cost = annual_rent * prop["mgmt_fee"]
-    expenses = interest + prop["insurance"] + prop["rates"] + prop["maintenance"] + mgmt_cost + prop["depreciation"]
-    tax_savings = min(expenses, annual_rent) * tax_rate
-
-    if prop["type"] == "Interest-Only":
-        monthly_pni = npf.pmt(prop["rate"] / 12, prop["term"] * 12, -prop["loan"])
-        annual_pni = monthly_pni * 12
-        cash_freed = annual_pni - interest
-    else:
-        cash_freed = 0
-
-    total_rent += annual_rent
-    total_expenses += expenses
-    total_tax_savings += tax_savings
-    total_cash_freed += cash_freed
-
-# --- Revolving Credit Impact ---
-balance = home_loan
-annual_savings = []
-principal_paid = []
-cumulative_interest_saved = []
-cumulative_saved = 0
-
-for year in range(1, projection_years + 1):
-    balance -= total_cash_freed
-    interest_saved = balance * home_rate
-    cumulative_saved += interest_saved
-    annual_savings.append(interest_saved)
-    principal_paid.append(total_cash_freed * year)
-    cumulative_interest_saved.append(cumulative_saved)
+# Cleared cells fall back to the defaults, and percentages become fractions.
+rentals_df = rentals_df.fillna(RENTAL_DEFAULTS).astype({field: type(value) for field, value in RENTAL_DEFAULTS.items()})
+rentals_df["rate"] /= 100
+rentals_df["mgmt_fee"] /= 100
+props_tuple = tuple(rentals_df[list(RENTAL_FIELDS)].itertuples(index=False, name=None))
+model_inputs = (props_tuple, tax_rate, home_loan, home_rate, projection_years)
+
+# Reruns triggered by anything other than a model input reuse this session's
+# last results without touching the caches.
+if st.session_state.get("model_inputs") != model_inputs:
+    st.session_state["model_results"] = compute_portfolio(*model_inputs)
+    st.session_state["model_inputs"] = model_inputs
+
+result = st.session_state["model_results"]
+total_rent, total_expenses, total_tax_savings, total_cash_freed, principal_paid, cumulative_interest_saved = result[:6]
+cumulative_saved = float(cumulative_interest_saved[-1])
 
 # --- Output Summary ---
 st.header("📊 Summary")
@@ -122,122 +389,30 @@ with col2:
 # --- Chart ---
 st.subheader("📈 Impact of Redirecting Rental Cash Flow to Home Loan")
 
-chart_data = pd.DataFrame({
-    "Year": list(range(1, projection_years + 1)),
+# Drawn client-side from the series; matplotlib is only used for the PDF copy.
+years = np.arange(1, projection_years + 1)
+st.line_chart(pd.DataFrame({
     "Total Extra Paid ($)": principal_paid,
     "Cumulative Interest Saved ($)": cumulative_interest_saved
-})
-
-fig, ax = plt.subplots(figsize=(10, 5))
-ax.plot(chart_data["Year"], chart_data["Total Extra Paid ($)"], label="Total Extra Paid", marker='o')
-ax.plot(chart_data["Year"], chart_data["Cumulative Interest Saved ($)"], label="Interest Saved", marker='s')
-ax.set_xlabel("Year")
-ax.set_ylabel("Amount ($)")
-ax.set_title("Owner-Occupied Loan Strategy")
-ax.grid(True)
-ax.legend()
-st.pyplot(fig)
-
-img_buffer = io.BytesIO()
-fig.savefig(img_buffer, format='png', bbox_inches='tight')
-img_buffer.seek(0)
-
+}, index=pd.Index(years, name="Year")))
 
 st.subheader("📤 Export Results")
 
 # --- CSV Export ---
-csv_data = pd.DataFrame(rental_properties)
-csv_data["Annual Rent"] = [p["rent_weekly"] * 52 for p in rental_properties]
-csv_data["Interest"] = [p["loan"] * p["rate"] for p in rental_properties]
-
-csv_buffer = io.StringIO()
-csv_data.to_csv(csv_buffer, index=False)
-st.download_button("📄 Download Rental Summary as CSV", data=csv_buffer.getvalue(),
+st.download_button("📄 Download Rental Summary as CSV", data=build_csv(props_tuple),
                    file_name="rental_summary.csv", mime="text/csv")
 
-import io
-from fpdf import FPDF
-
-# Save the matplotlib chart image
-image_path = "/tmp/chart.png"
-with open(image_path, "wb") as f:
-    f.write(img_buffer.getvalue())
-
-class PDF(FPDF):
-    def header(self):
-        self.set_font("Arial", "B", 12)
-        self.cell(0, 10, "NZ Property Portfolio Report", ln=True, align="C")
-
-    def section(self, title, content):
-        self.set_font("Arial", "B", 11)
-        self.cell(0, 10, title, ln=True)
-        self.set_font("Arial", "", 10)
-        for line in content:
-            self.cell(0, 8, line, ln=True)
-
-pdf = PDF()
-pdf.add_page()
-
-# Summary
-pdf.section("Rental Summary", [
-    f"Total Annual Rent: ${total_rent:,.0f}",
-    f"Total Expenses: ${total_expenses:,.0f}",
-    f"Total Tax Saved: ${total_tax_savings:,.0f}",
-    f"Cash Freed from Interest-Only Loans: ${total_cash_freed:,.0f}"
-])
-
-pdf.section("Owner-Occupied Loan Strategy", [
-    f"Extra Paid into Revolving Credit: ${total_cash_freed * projection_years:,.0f}",
-    f"Cumulative Interest Saved: ${cumulative_saved:,.0f}"
-])
-
-# Chart
-pdf.add_page()
-pdf.set_font("Arial", "B", 11)
-pdf.cell(0, 10, "Interest Savings Projection", ln=True)
-pdf.image(image_path, x=10, y=None, w=180)
-
-# Rental property breakdowns
-pdf.add_page()
-pdf.set_font("Arial", "B", 12)
-pdf.cell(0, 10, "Rental Property Details", ln=True)
-
-for idx, prop in enumerate(rental_properties):
-    annual_rent = prop["rent_weekly"] * 52
-    interest = prop["loan"] * prop["rate"]
-    mgmt_cost = annual_rent * prop["mgmt_fee"]
-    expenses = interest + prop["insurance"] + prop["rates"] + prop["maintenance"] + mgmt_cost + prop["depreciation"]
-    tax_savings = min(expenses, annual_rent) * tax_rate
-
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 10, f"Property {idx + 1}", ln=True)
-    pdf.set_font("Arial", "", 10)
-
-    prop_lines = [
-        f"Loan Balance: ${prop['loan']:,.0f}",
-        f"Interest Rate: {prop['rate']*100:.2f}%",
-        f"Term: {prop['term']} years",
-        f"Repayment Type: {prop['type']}",
-        f"Weekly Rent: ${prop['rent_weekly']:,.0f}",
-        f"Annual Rent: ${annual_rent:,.0f}",
-        f"Insurance: ${prop['insurance']:,.0f}",
-        f"Rates: ${prop['rates']:,.0f}",
-        f"Maintenance: ${prop['maintenance']:,.0f}",
-        f"Mgmt Fee: {prop['mgmt_fee']*100:.2f}%",
-        f"Depreciation: ${prop['depreciation']:,.0f}",
-        f"Annual Interest: ${interest:,.0f}",
-        f"Total Expenses: ${expenses:,.0f}",
-        f"Estimated Tax Savings: ${tax_savings:,.0f}"
-    ]
-
-    for line in prop_lines:
-        pdf.cell(0, 8, line, ln=True)
-    pdf.ln(4)
-
-# Finalise & Download
-pdf_buffer = io.BytesIO()
-pdf.output(pdf_buffer)
-pdf_buffer.seek(0)
-
-st.download_button("📄 Download Full PDF Report", data=pdf_buffer,
-                   file_name="nz_property_report.pdf", mime="application/pdf")
+# --- PDF Export ---
+# The report is only built on request; a prepared PDF is kept in session state
+# for as long as the inputs it was built from are unchanged.
+summary_tuple = (total_rent, total_expenses, total_tax_savings, total_cash_freed,
+                 total_cash_freed * projection_years, cumulative_saved)
+breakdown_tuple = (result.annual_rent, result.interest, result.expenses, result.tax_savings)
+if st.button("Prepare PDF Report"):
+    chart_png = render_chart(tuple(years), tuple(principal_paid), tuple(cumulative_interest_saved))
+    st.session_state["pdf_bytes"] = build_pdf_bytes(summary_tuple, props_tuple, breakdown_tuple, chart_png)
+    st.session_state["pdf_inputs"] = model_inputs
+
+if "pdf_bytes" in st.session_state and st.session_state.get("pdf_inputs") == model_inputs:
+    st.download_button("📄 Download Full PDF Report", data=st.session_state["pdf_bytes"],
+                       file_name="nz_property_report.pdf", mime="application/pdf")